@@ -1,6 +1,9 @@
 from crewai import Agent, Task, Crew
 from typing import Dict, Any, List, Optional, Callable
+import heapq
 import logging
+import time
+from operator import itemgetter
 from datetime import datetime
 
 from ..models.agent_config import AgentConfig
@@ -9,6 +12,13 @@ from ..services.deepseek_service import deepseek_service
 
 logger = logging.getLogger(__name__)
 
+# 流式输出合并：累计到指定块数或超过时间窗口后再向上游输出
+STREAM_FLUSH_CHUNKS = 8
+STREAM_FLUSH_INTERVAL = 0.05  # 秒
+
+# 对话历史窗口大小：窗口在 N 到 2N 之间只追加不滑动，保证请求前缀稳定以命中模型前缀缓存
+HISTORY_WINDOW_SIZE = 50
+
 class ConfigurableAgent:
     """
     可配置智能体
@@ -18,22 +28,38 @@ class ConfigurableAgent:
     def __init__(self, agent_config: AgentConfig, participant_config: Optional[MeetingParticipant] = None):
         self.config = agent_config
         self.participant_config = participant_config
+        # 配置字典缓存，以 updated_at 作为版本号，配置更新后自动失效
+        self._config_dict: Optional[Dict[str, Any]] = None
+        self._config_version: Optional[datetime] = None
+        # 说话风格提示词和响应约束只依赖配置，预先计算
+        self._style_prompt = ""
+        self._constraints: Dict[str, Any] = {}
+        self._prompt_version: Optional[datetime] = None
+        self._refresh_prompt_settings()
+        # 背景故事在Agent生命周期内保持字节级一致，便于命中前缀缓存
+        self._backstory_cached = self._build_enhanced_backstory()
         self.agent = self._create_crewai_agent()
-        self.conversation_history = []
+        # 对话历史只在窗口重置时从头部裁剪，其余时间只追加，保证窗口前缀不被淘汰挪动
+        self.conversation_history: List[Dict[str, Any]] = []
+        # 最近一次从调用方同步的消息标识，调用方每轮传入的是滑动的最近消息列表，只追加其中的新消息
+        self._last_synced_key: Optional[tuple] = None
+        # 发言权重中只依赖配置的部分，创建时计算一次
+        self._base_speaking_score = self._calculate_base_speaking_score()
+        # 专业领域预先转为小写并去重、去空，避免每轮逐个 lower() 和重复扫描
+        self._expertise_areas_lower = tuple(dict.fromkeys(
+            area.lower() for area in (agent_config.expertise_areas or []) if area
+        ))
         self.response_count = 0
         self.last_response_time = None
         
     def _create_crewai_agent(self) -> Agent:
         """基于配置创建CrewAI Agent"""
         
-        # 构建个性化的backstory
-        enhanced_backstory = self._build_enhanced_backstory()
-        
         # 创建Agent
         agent = Agent(
             role=self.config.role,
             goal=self.config.goal,
-            backstory=enhanced_backstory,
+            backstory=self._backstory_cached,
             verbose=True,
             allow_delegation=self._should_allow_delegation(),
             max_iter=self._get_max_iterations(),
@@ -44,41 +70,35 @@ class ConfigurableAgent:
         return agent
     
     def _build_enhanced_backstory(self) -> str:
-        """构建增强的背景故事"""
+        """构建增强的背景故事 (在 __init__ 中调用一次并缓存)"""
+        config = self.config
         backstory_parts = [
-            self.config.backstory,
+            config.backstory,
             "",
+            # 个性特征
             "个性特征:",
+            *[f"- {trait}: {value}" for trait, value in config.personality_traits.items()],
+            "",
+            # 说话风格
+            "说话风格:",
+            *[f"- {style}: {value}" for style, value in config.speaking_style.items()],
+            "",
+            # 行为设置
+            "行为倾向:",
+            *[f"- {behavior}: {value}" for behavior, value in config.behavior_settings.items()],
         ]
         
-        # 添加个性特征
-        for trait, value in self.config.personality_traits.items():
-            backstory_parts.append(f"- {trait}: {value}")
-        
-        backstory_parts.append("")
-        backstory_parts.append("说话风格:")
-        
-        # 添加说话风格
-        for style, value in self.config.speaking_style.items():
-            backstory_parts.append(f"- {style}: {value}")
-        
-        backstory_parts.append("")
-        backstory_parts.append("行为倾向:")
-        
-        # 添加行为设置
-        for behavior, value in self.config.behavior_settings.items():
-            backstory_parts.append(f"- {behavior}: {value}")
-        
         # 如果有专业领域，添加专业领域信息
-        if self.config.expertise_areas:
-            backstory_parts.append("")
-            backstory_parts.append(f"专业领域: {', '.join(self.config.expertise_areas)}")
+        if config.expertise_areas:
+            backstory_parts += ["", f"专业领域: {', '.join(config.expertise_areas)}"]
         
         # 如果有会议中的角色配置，添加角色信息
         if self.participant_config:
-            backstory_parts.append("")
-            backstory_parts.append(f"在本次会议中担任: {self.participant_config.role_in_meeting}")
-            backstory_parts.append(f"发言优先级: {self.participant_config.speaking_priority}")
+            backstory_parts += [
+                "",
+                f"在本次会议中担任: {self.participant_config.role_in_meeting}",
+                f"发言优先级: {self.participant_config.speaking_priority}"
+            ]
         
         return "\n".join(backstory_parts)
     
@@ -126,6 +146,48 @@ class ConfigurableAgent:
         
         return tools
     
+    def _get_config_dict(self) -> Dict[str, Any]:
+        """获取Agent配置字典 (按 updated_at 缓存，避免每轮重新构建)"""
+        if self._config_dict is None or self._config_version != self.config.updated_at:
+            self._config_dict = self.config.to_dict()
+            self._config_version = self.config.updated_at
+        return self._config_dict
+    
+    @staticmethod
+    def _history_key(message: Dict[str, Any]) -> tuple:
+        """消息在调用方历史中的标识 (创建时间, 内容)"""
+        return message.get("created_at"), message.get("content")
+    
+    def _sync_history(self, conversation_history: List[Dict[str, Any]]):
+        """
+        将调用方传入的最近消息并入内部历史
+
+        调用方每轮传入的是截断后的滑动列表，直接整体替换会让窗口起点每轮变化；
+        这里只追加上次同步之后的新消息。上次同步的消息已不在列表中 (中间有遗漏) 时，
+        才以传入列表重新开始
+        """
+        new_messages = conversation_history
+        if self._last_synced_key is not None:
+            for index in range(len(conversation_history) - 1, -1, -1):
+                if self._history_key(conversation_history[index]) == self._last_synced_key:
+                    new_messages = conversation_history[index + 1:]
+                    break
+            else:
+                self.conversation_history.clear()
+        self.conversation_history.extend(new_messages)
+        self._last_synced_key = self._history_key(conversation_history[-1])
+    
+    def _get_history_window(self) -> List[Dict[str, str]]:
+        """
+        获取发送给模型的对话历史窗口
+
+        窗口只在末尾追加，达到 2N 条时才一次性裁剪为最近 N 条，
+        避免每轮"丢最旧、加最新"导致请求前缀变化而无法命中缓存
+        """
+        if len(self.conversation_history) >= 2 * HISTORY_WINDOW_SIZE:
+            del self.conversation_history[:-HISTORY_WINDOW_SIZE]
+        return list(self.conversation_history)
+    
     async def generate_response(
         self,
         context: str,
@@ -144,15 +206,15 @@ class ConfigurableAgent:
             生成的响应和元数据
         """
         try:
-            # 更新内部对话历史
+            # 更新内部对话历史 (只追加新消息)
             if conversation_history:
-                self.conversation_history = conversation_history[-100:]  # 保留最近100条
+                self._sync_history(conversation_history)
             
             # 使用DeepSeek服务生成响应
             response = await deepseek_service.generate_agent_response(
                 context=context,
-                agent_config=self.config.to_dict(),
-                conversation_history=self.conversation_history,
+                agent_config=self._get_config_dict(),
+                conversation_history=self._get_history_window(),
                 meeting_context=meeting_context
             )
             
@@ -167,14 +229,16 @@ class ConfigurableAgent:
                 "response_count": self.response_count,
                 "personality_type": self.config.personality_traits.get("personality_type"),
                 "speaking_style": self.config.speaking_style.get("tone"),
-                "expertise_areas": self.config.expertise_areas
+                "expertise_areas": self.config.expertise_areas,
+                "prompt_cache_hit_tokens": response.get("usage", {}).get("prompt_cache_hit_tokens", 0)
             })
             
-            # 保存到对话历史
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": response["content"]
-            })
+            # 保存到对话历史 (由调用方提供历史时，本条发言会随下一轮的历史一并同步，不重复追加)
+            if not conversation_history:
+                self.conversation_history.append({
+                    "role": "assistant",
+                    "content": response["content"]
+                })
             
             return response
             
@@ -202,21 +266,32 @@ class ConfigurableAgent:
         生成流式响应 (用于实时显示)
         
         Yields:
-            生成的文本块
+            生成的文本块 (多个模型输出块按数量或时间窗口合并后输出)
         """
         try:
             # 更新对话历史
             if conversation_history:
-                self.conversation_history = conversation_history[-100:]
+                self._sync_history(conversation_history)
+            
+            buffer: List[str] = []
+            last_flush = time.monotonic()
             
             # 使用DeepSeek服务的流式生成
             async for chunk in deepseek_service.stream_agent_response(
                 context=context,
-                agent_config=self.config.to_dict(),
-                conversation_history=self.conversation_history,
+                agent_config=self._get_config_dict(),
+                conversation_history=self._get_history_window(),
                 meeting_context=meeting_context
             ):
-                yield chunk
+                buffer.append(chunk)
+                now = time.monotonic()
+                if len(buffer) >= STREAM_FLUSH_CHUNKS or now - last_flush >= STREAM_FLUSH_INTERVAL:
+                    yield "".join(buffer)
+                    buffer.clear()
+                    last_flush = now
+            
+            if buffer:
+                yield "".join(buffer)
             
             # 更新统计
             self.response_count += 1
@@ -226,23 +301,8 @@ class ConfigurableAgent:
             logger.error(f"Agent {self.config.name} stream response failed: {str(e)}")
             yield f"[{self.config.name}] 响应生成失败: {str(e)}"
     
-    def should_speak_now(
-        self,
-        current_context: str,
-        recent_speakers: List[int],
-        meeting_rules: Dict[str, Any]
-    ) -> float:
-        """
-        计算当前是否应该发言的权重分数
-        
-        Args:
-            current_context: 当前讨论内容
-            recent_speakers: 最近发言的Agent ID列表
-            meeting_rules: 会议规则
-            
-        Returns:
-            发言权重分数 (0-1之间，越高越应该发言)
-        """
+    def _calculate_base_speaking_score(self) -> float:
+        """计算只依赖静态配置的发言权重部分"""
         base_score = 0.5  # 基础分数
         
         # 1. 基于参与者优先级
@@ -266,17 +326,39 @@ class ConfigurableAgent:
         elif initiative == "low":
             base_score *= 0.8
         
+        return base_score
+    
+    def should_speak_now(
+        self,
+        current_context: str,
+        recent_speakers: List[int],
+        meeting_rules: Dict[str, Any],
+        context_lower: Optional[str] = None
+    ) -> float:
+        """
+        计算当前是否应该发言的权重分数
+        
+        Args:
+            current_context: 当前讨论内容
+            recent_speakers: 最近发言的Agent ID列表
+            meeting_rules: 会议规则
+            context_lower: 已转为小写的讨论内容 (由管理器每轮计算一次后传入)
+            
+        Returns:
+            发言权重分数 (0-1之间，越高越应该发言)
+        """
+        # 1-2. 基于参与者优先级和个性设置 (创建时已预计算)
+        base_score = self._base_speaking_score
+        
         # 3. 基于最近发言情况
         if self.config.id in recent_speakers[-3:]:  # 如果最近3次发言中包含自己
             base_score *= 0.6  # 降低权重，给其他人机会
         
         # 4. 基于专业领域相关性
-        if self.config.expertise_areas and current_context:
-            context_lower = current_context.lower()
-            relevant_areas = 0
-            for area in self.config.expertise_areas:
-                if area.lower() in context_lower:
-                    relevant_areas += 1
+        if self._expertise_areas_lower and current_context:
+            if context_lower is None:
+                context_lower = current_context.lower()
+            relevant_areas = sum(1 for area in self._expertise_areas_lower if area in context_lower)
             
             if relevant_areas > 0:
                 base_score *= (1.0 + relevant_areas * 0.2)  # 相关专业领域加分
@@ -288,8 +370,26 @@ class ConfigurableAgent:
         
         return min(1.0, max(0.0, base_score))  # 限制在0-1范围内
     
+    def _refresh_prompt_settings(self) -> None:
+        """配置版本 (updated_at) 变化时重新计算说话风格提示词和响应约束"""
+        if self._style_prompt and self._prompt_version == self.config.updated_at:
+            return
+        self._style_prompt = self._build_speaking_style_prompt()
+        self._constraints = self._build_response_constraints()
+        self._prompt_version = self.config.updated_at
+    
     def get_speaking_style_prompt(self) -> str:
-        """获取说话风格提示词"""
+        """获取说话风格提示词 (预计算)"""
+        self._refresh_prompt_settings()
+        return self._style_prompt
+    
+    def get_response_constraints(self) -> Dict[str, Any]:
+        """获取响应约束条件 (预计算)"""
+        self._refresh_prompt_settings()
+        return dict(self._constraints)
+    
+    def _build_speaking_style_prompt(self) -> str:
+        """构建说话风格提示词"""
         style = self.config.speaking_style
         personality = self.config.personality_traits
         
@@ -321,8 +421,8 @@ class ConfigurableAgent:
         
         return "请按照以下风格要求回答: " + "; ".join(style_elements)
     
-    def get_response_constraints(self) -> Dict[str, Any]:
-        """获取响应约束条件"""
+    def _build_response_constraints(self) -> Dict[str, Any]:
+        """构建响应约束条件"""
         constraints = {}
         
         # 基于说话风格设置token限制
@@ -403,6 +503,31 @@ class MeetingAgentManager:
         """获取所有Agent"""
         return list(self.agents.values())
     
+    def calculate_next_speakers(
+        self,
+        current_context: str,
+        recent_speakers: List[int],
+        meeting_rules: Dict[str, Any],
+        k: int = 1
+    ) -> List[ConfigurableAgent]:
+        """计算发言权重最高的 k 个发言者 (按权重从高到低)"""
+        if not self.agents or k <= 0:
+            return []
+        
+        # 讨论内容每轮只转换一次小写，所有Agent共用
+        context_lower = current_context.lower() if current_context else current_context
+        
+        # 计算每个Agent的发言权重
+        # 评分为纯内存计算且会议人数较少，直接在当前线程内联完成；
+        # 受GIL限制，线程池并行只会增加调度开销
+        speaker_scores = [
+            (agent.should_speak_now(current_context, recent_speakers, meeting_rules, context_lower), agent)
+            for agent in self.agents.values()
+        ]
+        
+        # 只取前 k 个，避免全量排序
+        return [agent for _, agent in heapq.nlargest(k, speaker_scores, key=itemgetter(0))]
+    
     def calculate_next_speaker(
         self,
         current_context: str,
@@ -410,48 +535,47 @@ class MeetingAgentManager:
         meeting_rules: Dict[str, Any]
     ) -> Optional[ConfigurableAgent]:
         """计算下一个发言者"""
-        if not self.agents:
-            return None
-        
-        # 计算每个Agent的发言权重
-        speaker_scores = {}
-        for agent_id, agent in self.agents.items():
-            score = agent.should_speak_now(current_context, recent_speakers, meeting_rules)
-            speaker_scores[agent_id] = score
-        
-        # 选择得分最高的Agent
-        if speaker_scores:
-            best_agent_id = max(speaker_scores.keys(), key=lambda k: speaker_scores[k])
-            return self.agents[best_agent_id]
-        
-        return None
+        speakers = self.calculate_next_speakers(current_context, recent_speakers, meeting_rules, k=1)
+        return speakers[0] if speakers else None
     
-    def get_meeting_statistics(self) -> Dict[str, Any]:
-        """获取会议统计信息"""
+    def get_meeting_statistics(self, top_k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        获取会议统计信息
+        
+        Args:
+            top_k: 只返回发言次数最多的前 k 个Agent统计，默认返回全部
+        """
         if not self.agents:
             return {}
         
-        total_responses = sum(agent.response_count for agent in self.agents.values())
-        active_agents = len([agent for agent in self.agents.values() if agent.response_count > 0])
-        
-        # 按发言次数排序
+        # 单次遍历同时完成汇总和明细构建
+        total_responses = 0
+        active_agents = 0
         agent_stats = []
         for agent in self.agents.values():
+            response_count = agent.response_count
+            total_responses += response_count
+            if response_count > 0:
+                active_agents += 1
             agent_stats.append({
                 "agent_id": agent.config.id,
                 "name": agent.config.name,
                 "role": agent.config.role,
-                "response_count": agent.response_count,
+                "response_count": response_count,
                 "last_response_time": agent.last_response_time.isoformat() if agent.last_response_time else None
             })
         
-        agent_stats.sort(key=lambda x: x["response_count"], reverse=True)
+        # 按发言次数排序
+        if top_k is not None:
+            agent_stats = heapq.nlargest(top_k, agent_stats, key=itemgetter("response_count"))
+        else:
+            agent_stats.sort(key=itemgetter("response_count"), reverse=True)
         
         return {
             "total_agents": len(self.agents),
             "active_agents": active_agents,
             "total_responses": total_responses,
-            "average_responses_per_agent": total_responses / len(self.agents) if self.agents else 0,
+            "average_responses_per_agent": total_responses / len(self.agents),
             "agent_statistics": agent_stats,
             "most_active_agent": agent_stats[0] if agent_stats else None
         }
\ No newline at end of file
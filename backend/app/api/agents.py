@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from ..models import get_database_session, AgentConfig
 from ..services.agent_service import AgentService
@@ -34,6 +35,8 @@ class AgentUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 class AgentResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     role: str
@@ -70,7 +73,7 @@ async def create_agent(
     """
     try:
         agent = await agent_service.create_agent(
-            agent_data=agent_data.dict(),
+            agent_data=agent_data.model_dump(),
             created_by="api_user"  # TODO: 从认证信息获取用户ID
         )
         return AgentResponse(**agent.to_dict())
@@ -79,7 +82,7 @@ async def create_agent(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@router.get("/agents", response_model=List[AgentResponse])
+@router.get("/agents", responses={200: {"model": List[AgentResponse]}})
 def get_agents(
     is_active: Optional[bool] = Query(None, description="是否只获取活跃的智能体"),
     agent_service: AgentService = Depends(get_agent_service)
@@ -96,7 +99,75 @@ def get_agents(
             agents = agent_service.get_agents(skip=0, limit=1000, active_only=is_active)
         else:
             agents = agent_service.get_agents(skip=0, limit=1000, active_only=False)
-        return [AgentResponse(**agent.to_dict()) for agent in agents]
+        # to_dict() 结果已符合 AgentResponse 结构，直接序列化返回，不经过响应模型校验；
+        # AgentResponse 只通过 responses 声明到 OpenAPI 文档中
+        return ORJSONResponse(content=[agent.to_dict_cached() for agent in agents])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+# 固定路径的路由必须声明在 /agents/{agent_id} 之前，否则会被动态路由提前匹配
+@router.get("/agents/search", responses={200: {"model": List[AgentResponse]}})
+def search_agents(
+    keyword: str = Query(None),
+    roles: Optional[List[str]] = Query(None),
+    expertise_areas: Optional[List[str]] = Query(None),
+    agent_service: AgentService = Depends(get_agent_service)
+):
+    """
+    搜索Agent
+    """
+    try:
+        agents = agent_service.search_agents(
+            keyword=keyword,
+            roles=roles,
+            expertise_areas=expertise_areas
+        )
+        # to_dict() 结果已符合 AgentResponse 结构，直接序列化返回，不经过响应模型校验；
+        # AgentResponse 只通过 responses 声明到 OpenAPI 文档中
+        return ORJSONResponse(content=[agent.to_dict_cached() for agent in agents])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/agents/statistics")
+def get_agent_statistics(
+    agent_service: AgentService = Depends(get_agent_service)
+):
+    """
+    获取Agent统计信息
+    """
+    try:
+        stats = agent_service.get_agent_statistics()
+        return stats
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/agents/validate")
+def validate_agent_config(
+    agent_data: AgentCreate,
+    agent_service: AgentService = Depends(get_agent_service)
+):
+    """
+    验证Agent配置数据
+    """
+    try:
+        errors = agent_service.validate_agent_config(agent_data.model_dump())
+        return {
+            "valid": len(errors) == 0,
+            "errors": errors
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/agents/templates")
+def get_agent_templates(
+    agent_service: AgentService = Depends(get_agent_service)
+):
+    """
+    获取Agent模板列表
+    """
+    try:
+        templates = agent_service.get_agent_templates()
+        return {"templates": templates}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -109,10 +180,10 @@ def get_agent(
     根据ID获取Agent配置
     """
     try:
-        agent = agent_service.get_agent_by_id(agent_id)
+        agent = agent_service.get_agent_dict(agent_id)
         if not agent:
             raise HTTPException(status_code=404, detail="Agent not found")
-        return AgentResponse(**agent.to_dict())
+        return AgentResponse(**agent)
     except HTTPException:
         raise
     except Exception as e:
@@ -129,7 +200,7 @@ async def update_agent(
     """
     try:
         # 过滤None值
-        update_data = {k: v for k, v in agent_data.dict().items() if v is not None}
+        update_data = agent_data.model_dump(exclude_none=True)
         
         agent = await agent_service.update_agent(agent_id, update_data)
         if not agent:
@@ -165,26 +236,6 @@ def delete_agent(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@router.get("/agents/search")
-def search_agents(
-    keyword: str = Query(None),
-    roles: Optional[List[str]] = Query(None),
-    expertise_areas: Optional[List[str]] = Query(None),
-    agent_service: AgentService = Depends(get_agent_service)
-):
-    """
-    搜索Agent
-    """
-    try:
-        agents = agent_service.search_agents(
-            keyword=keyword,
-            roles=roles,
-            expertise_areas=expertise_areas
-        )
-        return [AgentResponse(**agent.to_dict()) for agent in agents]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-
 @router.post("/agents/{agent_id}/test")
 async def test_agent_response(
     agent_id: int,
@@ -227,48 +278,5 @@ def clone_agent(
         return AgentResponse(**agent.to_dict())
     except HTTPException:
         raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-
-@router.get("/agents/statistics")
-def get_agent_statistics(
-    agent_service: AgentService = Depends(get_agent_service)
-):
-    """
-    获取Agent统计信息
-    """
-    try:
-        stats = agent_service.get_agent_statistics()
-        return stats
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-
-@router.post("/agents/validate")
-def validate_agent_config(
-    agent_data: AgentCreate,
-    agent_service: AgentService = Depends(get_agent_service)
-):
-    """
-    验证Agent配置数据
-    """
-    try:
-        errors = agent_service.validate_agent_config(agent_data.dict())
-        return {
-            "valid": len(errors) == 0,
-            "errors": errors
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-
-@router.get("/agents/templates")
-def get_agent_templates(
-    agent_service: AgentService = Depends(get_agent_service)
-):
-    """
-    获取Agent模板列表
-    """
-    try:
-        templates = agent_service.get_agent_templates()
-        return {"templates": templates}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
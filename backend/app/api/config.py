@@ -1,14 +1,324 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Dict, Any, List, Optional
-from pydantic import BaseModel
-
-from ..models import get_database_session
-from ..services.deepseek_service import deepseek_service, api_key_manager
+from fastapi import APIRouter, HTTPException, Request, Response
+from sqlalchemy import text
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict
+import aiohttp
+import asyncio
+import functools
+import hashlib
+import orjson
+import time
+
+from ..models import engine
+from ..services.deepseek_service import (
+    deepseek_service,
+    api_key_manager,
+    get_http_session,
+    MODEL_PRICING,
+    get_service_for_key
+)
+from ..services.redis_client import redis_client
 from datetime import datetime
 
 router = APIRouter()
 
+# 静态模型/配置元数据，在模块加载时构建一次，处理请求时直接返回引用
+# 注意：不要在处理函数中修改这些对象
+_AVAILABLE_MODELS = [
+    {
+        "id": "deepseek-chat",
+        "name": "DeepSeek Chat (V3.1)",
+        "description": "DeepSeek-V3.1 非思考模式，适合日常对话和任务",
+        "max_tokens": 4096,
+        "pricing": {
+            "input": "$0.14 / 1M tokens",
+            "output": "$0.28 / 1M tokens"
+        }
+    },
+    {
+        "id": "deepseek-reasoner",
+        "name": "DeepSeek Reasoner (V3.1)",
+        "description": "DeepSeek-V3.1 思考模式，适合复杂推理任务",
+        "max_tokens": 4096,
+        "pricing": {
+            "input": "$0.55 / 1M tokens",
+            "output": "$2.19 / 1M tokens"
+        }
+    },
+    {
+        "id": "gpt-3.5-turbo",
+        "name": "GPT-3.5 Turbo",
+        "description": "OpenAI GPT-3.5 Turbo 模型",
+        "max_tokens": 4096,
+        "pricing": {
+            "input": "自定义定价",
+            "output": "自定义定价"
+        }
+    },
+    {
+        "id": "gpt-4",
+        "name": "GPT-4",
+        "description": "OpenAI GPT-4 模型",
+        "max_tokens": 8192,
+        "pricing": {
+            "input": "自定义定价",
+            "output": "自定义定价"
+        }
+    }
+]
+
+_DEEPSEEK_MODELS_RESPONSE = {
+    "models": [
+        {
+            "id": "deepseek-chat",
+            "name": "DeepSeek Chat (V3.1)",
+            "description": "DeepSeek-V3.1 非思考模式，适合日常对话和多数任务",
+            "max_tokens": 4096,
+            "context_length": "128K tokens",
+            "pricing": {
+                "input": "$0.14 / 1M tokens",
+                "output": "$0.28 / 1M tokens"
+            },
+            "features": ["general_conversation", "coding", "analysis", "creative_writing"]
+        },
+        {
+            "id": "deepseek-reasoner",
+            "name": "DeepSeek Reasoner (V3.1)",
+            "description": "DeepSeek-V3.1 思考模式，适合复杂推理和问题解决",
+            "max_tokens": 4096,
+            "context_length": "128K tokens",
+            "pricing": {
+                "input": "$0.55 / 1M tokens",
+                "output": "$2.19 / 1M tokens"
+            },
+            "features": ["complex_reasoning", "math", "science", "logical_analysis"]
+        }
+    ],
+    "default_model": "deepseek-chat",
+    "api_base_url": "https://api.deepseek.com",
+    "documentation": "https://api-docs.deepseek.com/zh-cn/",
+    "updated_at": "2024-12-26"  # DeepSeek V3 发布日期
+}
+
+# 支持的常见模型（不再限制为 DeepSeek only）
+_COMMON_MODELS = frozenset({
+    "deepseek-chat", "deepseek-reasoner",
+    "gpt-3.5-turbo", "gpt-4", "gpt-4-turbo",
+    "claude-3-sonnet", "claude-3-opus"
+})
+_BASE_URL_SCHEMES = ("https://", "http://")
+_API_KEY_PREFIXES = ("sk-", "eyJ", "ak-")  # OpenAI, JWT token, 其他格式
+
+# 用户未保存模型配置时使用的共享空配置，避免每次请求分配空字典 (只读)
+_EMPTY_CONFIG: Dict[str, Any] = {}
+
+# 完全静态的响应预先序列化，请求时直接返回字节，跳过序列化
+_DEEPSEEK_MODELS_BYTES = orjson.dumps(_DEEPSEEK_MODELS_RESPONSE)
+
+_EXPORT_CONFIG_BASE = {
+    "version": "2.0.0",
+    "ai_provider": {
+        "name": "DeepSeek",
+        "base_url": "https://api.deepseek.com",
+        "default_model": "deepseek-chat",
+        "supported_models": ["deepseek-chat", "deepseek-reasoner"]
+    },
+    "limits": {
+        "max_tokens_per_request": 4096,
+        "max_participants_per_meeting": 10,
+        "max_messages_per_meeting": 1000,
+        "context_length": "128K tokens"
+    },
+    "features": {
+        "agent_customization": True,
+        "meeting_replay": True,
+        "real_time_collaboration": True,
+        "analytics": True,
+        "deepseek_integration": True
+    }
+}
+
+# 静态配置只在发布时变化，按内容计算 ETag，客户端缓存命中时返回 304
+STATIC_CONFIG_CACHE_CONTROL = "public, max-age=3600"
+_DEEPSEEK_MODELS_ETAG = f'"{hashlib.md5(_DEEPSEEK_MODELS_BYTES).hexdigest()}"'
+_EXPORT_CONFIG_HASH = hashlib.md5(orjson.dumps(_EXPORT_CONFIG_BASE)).hexdigest()
+
+# 导出内容带导出时间戳，不允许共享缓存存储，客户端每次都需重新验证
+EXPORT_CONFIG_CACHE_CONTROL = "private, no-cache"
+EXPORT_TIMESTAMP_BUCKET_SECONDS = 60
+
+@functools.lru_cache(maxsize=1)
+def _export_config_body(bucket: int) -> bytes:
+    """按分钟桶生成导出配置的 JSON 字节，同一分钟内的导出直接复用"""
+    return orjson.dumps({
+        **_EXPORT_CONFIG_BASE,
+        "export_timestamp": _utc_now_iso()
+    })
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """客户端携带的 If-None-Match 是否与当前 ETag 一致"""
+    return request.headers.get("if-none-match") == etag
+
+# 默认模型 (deepseek-chat) 的单 token 价格，成本估算时直接内联计算
+_INPUT_PRICE_PER_TOKEN, _OUTPUT_PRICE_PER_TOKEN = (
+    price / 1000000 for price in MODEL_PRICING["deepseek-chat"]
+)
+
+# 典型场景的成本估算只依赖常量，模块加载时计算一次
+_COST_SCENARIOS = {
+    name: round(deepseek_service.estimate_cost(input_tokens, output_tokens), 6)
+    for name, (input_tokens, output_tokens) in {
+        "short_conversation": (500, 200),
+        "medium_conversation": (1500, 800),
+        "long_conversation": (3000, 1500),
+        "meeting_hour": (5000, 3000)  # 假设一小时会议
+    }.items()
+}
+
+# 响应缓存 (进程内)：缓存键 -> (过期时间, 响应数据)
+# 按用户变化的结果必须以 user_id 作为缓存键的一部分，并在该用户配置变更时失效
+MODEL_CONFIG_CACHE_TTL = 60  # 秒
+RESPONSE_CACHE_MAXSIZE = 1024
+_response_cache: Dict[Any, Tuple[float, Any]] = {}
+
+def _utc_now_iso() -> str:
+    """当前 UTC 时间的 ISO 8601 字符串"""
+    return datetime.utcnow().isoformat() + "Z"
+
+def _get_cached_response(key: Any) -> Optional[Any]:
+    """读取未过期的缓存响应"""
+    cached = _response_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+def _set_cached_response(key: Any, value: Any, ttl: float) -> None:
+    """写入缓存响应，超过容量时整体清空"""
+    if len(_response_cache) >= RESPONSE_CACHE_MAXSIZE:
+        _response_cache.clear()
+    _response_cache[key] = (time.monotonic() + ttl, value)
+
+# 健康检查中单个探测的超时时间，避免上游缓慢时请求无限挂起
+HEALTH_PROBE_TIMEOUT = 3.0  # 秒
+
+# 健康检查结果缓存时间，探测耗时较长时按倍数延长，但不超过上限
+HEALTH_CACHE_TTL = 10  # 秒
+HEALTH_CACHE_MAX_TTL = 60  # 秒
+HEALTH_CACHE_BACKOFF_FACTOR = 10
+_last_healthy_status: Dict[str, Dict[str, Any]] = {}
+_health_probes: Dict[str, "asyncio.Future"] = {}
+
+def _extract_content(response_data: Any) -> str:
+    """提取 chat completion 响应中的文本内容，结构不完整时返回空字符串"""
+    try:
+        return response_data["choices"][0]["message"]["content"] or ""
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+def _resolve_key(user_id: str) -> Optional[str]:
+    """一次性解析用户的API密钥，未配置时返回 None"""
+    return api_key_manager.get_key(user_id) if api_key_manager.has_key(user_id) else None
+
+def _invalidate_user_cache(user_id: str) -> None:
+    """用户密钥或模型配置变更后使该用户的缓存失效"""
+    _response_cache.pop(("health", user_id), None)
+    _response_cache.pop(("model-config", user_id), None)
+    _last_healthy_status.pop(user_id, None)
+
+# API密钥校验结果缓存：sha256(密钥) -> 过期时间，只缓存校验通过的结果，不保存明文密钥
+API_KEY_VALIDATION_CACHE_TTL = 600  # 秒
+API_KEY_VALIDATION_CACHE_MAXSIZE = 1024
+_validated_keys: Dict[str, float] = {}
+
+def _hash_api_key(api_key: str) -> str:
+    """计算API密钥的缓存键"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+async def _validate_api_key_cached(api_key: str) -> bool:
+    """校验API密钥，近期已校验通过的密钥直接返回，避免重复请求上游"""
+    key_hash = _hash_api_key(api_key)
+    expires_at = _validated_keys.get(key_hash)
+    if expires_at and expires_at > time.monotonic():
+        return True
+    
+    is_valid = await deepseek_service.validate_api_key(api_key)
+    if is_valid:
+        if len(_validated_keys) >= API_KEY_VALIDATION_CACHE_MAXSIZE:
+            _validated_keys.clear()
+        _validated_keys[key_hash] = time.monotonic() + API_KEY_VALIDATION_CACHE_TTL
+    return is_valid
+
+# 连接测试：上游响应体大小上限与分阶段超时，防止异常服务占用内存或长时间挂起
+TEST_RESPONSE_MAX_BYTES = 65536
+TEST_CONNECTION_TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5, sock_read=10)
+# 连接测试使用的固定对话消息 (只读，每次请求共享)
+_TEST_MESSAGES = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "Hello! This is a connection test. Please respond briefly."}
+]
+
+async def _read_limited(response: aiohttp.ClientResponse, limit: int) -> bytes:
+    """读取响应体，超过上限时返回 502"""
+    if response.content_length and response.content_length > limit:
+        raise HTTPException(status_code=502, detail="API response too large")
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(8192):
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=502, detail="API response too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+# /models 列表查询结果缓存时间；列表可能较大，单独设置读取上限
+MODEL_LIST_CACHE_TTL = 60  # 秒
+MODEL_LIST_MAX_BYTES = 1048576
+
+# 服务不支持 /models (或查询失败) 时缓存的占位值，缓存期内直接回退到对话请求
+_MODEL_LIST_UNSUPPORTED = object()
+
+async def _fetch_model_ids(models_url: str, api_key: str, headers: Dict[str, str]) -> Optional[frozenset]:
+    """
+    查询 OpenAI 兼容服务的 /models 列表，返回模型ID集合
+
+    结果按 (地址, 密钥哈希) 缓存；服务不支持或请求失败时返回 None，由调用方回退到对话请求，
+    这一结果同样缓存，缓存期内不再重复查询 /models
+    """
+    cache_key = ("model-list", models_url, _hash_api_key(api_key))
+    cached = _get_cached_response(cache_key)
+    if cached is not None:
+        return None if cached is _MODEL_LIST_UNSUPPORTED else cached
+
+    model_ids = await _request_model_ids(models_url, headers)
+    _set_cached_response(
+        cache_key,
+        _MODEL_LIST_UNSUPPORTED if model_ids is None else model_ids,
+        MODEL_LIST_CACHE_TTL
+    )
+    return model_ids
+
+async def _request_model_ids(models_url: str, headers: Dict[str, str]) -> Optional[frozenset]:
+    """请求 /models 列表，非 200 响应、超时或格式不符时返回 None"""
+    try:
+        async with get_http_session().get(
+            models_url,
+            headers=headers,
+            timeout=TEST_CONNECTION_TIMEOUT
+        ) as response:
+            if response.status != 200:
+                return None
+            response_data = orjson.loads(await _read_limited(response, MODEL_LIST_MAX_BYTES))
+        model_ids = frozenset(item["id"] for item in response_data["data"])
+    except (HTTPException, aiohttp.ClientError, asyncio.TimeoutError,
+            orjson.JSONDecodeError, KeyError, TypeError):
+        return None
+    return model_ids
+
+def _ping_database() -> None:
+    """执行 SELECT 1 检查数据库连接 (阻塞操作，在线程中执行)"""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
 # Pydantic 模型定义
 class APIKeyRequest(BaseModel):
     api_key: str
@@ -20,11 +330,62 @@ class ModelConfigRequest(BaseModel):
     max_tokens: Optional[int] = 1000
 
 class SystemConfigResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     available_models: List[str]
     current_model: str
     api_key_configured: bool
     service_status: str
 
+class CostEstimateResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    input_tokens: int
+    output_tokens: int
+    estimated_cost_usd: float
+    scenarios: Dict[str, float]
+    currency: str
+    last_updated: str
+
+class ModelConfigResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    openai_api_key: Optional[str]
+    openai_base_url: str
+    model: str
+    max_tokens: int
+    temperature: float
+    is_configured: bool
+    available_models: List[Dict[str, Any]]
+
+class DeepSeekModelsResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    models: List[Dict[str, Any]]
+    default_model: str
+    api_base_url: str
+    documentation: str
+    updated_at: str
+
+class ExportConfigResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    version: str
+    ai_provider: Dict[str, Any]
+    limits: Dict[str, Any]
+    features: Dict[str, bool]
+    export_timestamp: str
+
+class HealthStatusResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    database: str
+    deepseek_api: str
+    api_key_status: str
+    timestamp: str
+    overall: str
+    stale: Optional[bool] = None
+
 # API密钥管理
 @router.post("/config/deepseek-key")
 async def set_deepseek_api_key(
@@ -33,130 +394,100 @@ async def set_deepseek_api_key(
     """
     设置 DeepSeek API 密钥
     """
-    try:
-        # 验证API密钥
-        is_valid = await deepseek_service.validate_api_key(key_request.api_key)
-        if not is_valid:
-            raise HTTPException(status_code=400, detail="Invalid API key")
-        
-        # 保存API密钥
-        api_key_manager.set_key(key_request.user_id, key_request.api_key)
-        
-        return {
-            "message": "API key saved successfully",
-            "valid": True,
-            "user_id": key_request.user_id
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save API key: {str(e)}")
+    # 先做格式校验，明显无效的密钥无需发起网络请求
+    api_key = key_request.api_key.strip()
+    if not api_key.startswith("sk-") or len(api_key) < 20:
+        raise HTTPException(status_code=400, detail="Invalid API key format")
+    
+    # 验证API密钥
+    is_valid = await _validate_api_key_cached(api_key)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail="Invalid API key")
+    
+    # 保存API密钥
+    api_key_manager.set_key(key_request.user_id, api_key)
+    _invalidate_user_cache(key_request.user_id)
+    
+    return {
+        "message": "API key saved successfully",
+        "valid": True,
+        "user_id": key_request.user_id
+    }
+
+def _build_key_status(user_id: str, has_key: bool) -> Dict[str, Any]:
+    """构建API密钥状态"""
+    return {
+        "user_id": user_id,
+        "has_api_key": has_key,
+        "key_masked": "sk-****" if has_key else None
+    }
 
 @router.get("/config/deepseek-key")
-def get_deepseek_api_key_status(
+async def get_deepseek_api_key_status(
     user_id: str = "default"
 ):
     """
     检查 DeepSeek API 密钥状态
     """
-    try:
-        has_key = api_key_manager.has_key(user_id)
-        
-        return {
-            "user_id": user_id,
-            "has_api_key": has_key,
-            "key_masked": "sk-****" if has_key else None
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to check API key: {str(e)}")
+    return _build_key_status(user_id, api_key_manager.has_key(user_id))
 
 @router.delete("/config/deepseek-key")
-def remove_deepseek_api_key(
+async def remove_deepseek_api_key(
     user_id: str = "default"
 ):
     """
     删除 DeepSeek API 密钥
     """
-    try:
-        api_key_manager.remove_key(user_id)
-        
-        return {
-            "message": "API key removed successfully",
-            "user_id": user_id
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to remove API key: {str(e)}")
+    removed_key = api_key_manager.get_key(user_id)
+    if removed_key:
+        _validated_keys.pop(_hash_api_key(removed_key), None)
+    api_key_manager.remove_key(user_id)
+    _invalidate_user_cache(user_id)
+    
+    return {
+        "message": "API key removed successfully",
+        "user_id": user_id
+    }
+
+async def _build_model_config(user_id: str, has_key: bool) -> Dict[str, Any]:
+    """
+    构建用户的模型配置
+
+    未配置 Redis 时按用户缓存在进程内；配置了 Redis 时配置在多个 worker 间共享，
+    进程内缓存只能由处理写入的 worker 失效，因此每次直接读取 Redis
+    """
+    cache_key = ("model-config", user_id)
+    if redis_client is None:
+        cached = _get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+    # 检查是否有存储的配置，否则使用默认的 DeepSeek 配置
+    # 配置了 Redis 时读取是同步网络调用，放到线程中执行，避免阻塞事件循环
+    stored_config = await asyncio.to_thread(api_key_manager.get_config, user_id) or _EMPTY_CONFIG
+
+    result = {
+        "openai_api_key": "sk-****" if has_key else None,
+        "openai_base_url": stored_config.get("base_url", "https://api.deepseek.com"),
+        "model": stored_config.get("model", "deepseek-chat"),
+        "max_tokens": stored_config.get("max_tokens", 2000),
+        "temperature": stored_config.get("temperature", 0.7),
+        "is_configured": has_key,
+        "available_models": _AVAILABLE_MODELS
+    }
+    if redis_client is None:
+        _set_cached_response(cache_key, result, MODEL_CONFIG_CACHE_TTL)
+    return result
 
 # 模型配置管理
-@router.get("/config/models")
-def get_model_config(user_id: str = "default"):
+@router.get("/config/models", response_model=ModelConfigResponse)
+async def get_model_config(user_id: str = "default"):
     """
     获取模型配置 - 支持通用 OpenAI 兼容 API
 
     默认配置为 DeepSeek，但支持其他 OpenAI 兼容服务
     """
-    try:
-        has_key = api_key_manager.has_key(user_id)
-
-        # 检查是否有存储的配置，否则使用默认的 DeepSeek 配置
-        stored_config = getattr(api_key_manager, 'configs', {}).get(user_id, {})
-
-        return {
-            "openai_api_key": "sk-****" if has_key else None,
-            "openai_base_url": stored_config.get("base_url", "https://api.deepseek.com"),
-            "model": stored_config.get("model", "deepseek-chat"),
-            "max_tokens": stored_config.get("max_tokens", 2000),
-            "temperature": stored_config.get("temperature", 0.7),
-            "is_configured": has_key,
-            "available_models": [
-                {
-                    "id": "deepseek-chat",
-                    "name": "DeepSeek Chat (V3.1)",
-                    "description": "DeepSeek-V3.1 非思考模式，适合日常对话和任务",
-                    "max_tokens": 4096,
-                    "pricing": {
-                        "input": "$0.14 / 1M tokens",
-                        "output": "$0.28 / 1M tokens"
-                    }
-                },
-                {
-                    "id": "deepseek-reasoner",
-                    "name": "DeepSeek Reasoner (V3.1)",
-                    "description": "DeepSeek-V3.1 思考模式，适合复杂推理任务",
-                    "max_tokens": 4096,
-                    "pricing": {
-                        "input": "$0.55 / 1M tokens",
-                        "output": "$2.19 / 1M tokens"
-                    }
-                },
-                {
-                    "id": "gpt-3.5-turbo",
-                    "name": "GPT-3.5 Turbo",
-                    "description": "OpenAI GPT-3.5 Turbo 模型",
-                    "max_tokens": 4096,
-                    "pricing": {
-                        "input": "自定义定价",
-                        "output": "自定义定价"
-                    }
-                },
-                {
-                    "id": "gpt-4",
-                    "name": "GPT-4",
-                    "description": "OpenAI GPT-4 模型",
-                    "max_tokens": 8192,
-                    "pricing": {
-                        "input": "自定义定价",
-                        "output": "自定义定价"
-                    }
-                }
-            ]
-        }
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get model config: {str(e)}")
+    return await _build_model_config(user_id, api_key_manager.has_key(user_id))
 
 @router.post("/config/models")
 async def update_model_config(
@@ -175,77 +506,62 @@ async def update_model_config(
       "temperature": 0.7
     }
     """
-    try:
-        # 支持的常见模型（不再限制为 DeepSeek only）
-        common_models = [
-            "deepseek-chat", "deepseek-reasoner",
-            "gpt-3.5-turbo", "gpt-4", "gpt-4-turbo",
-            "claude-3-sonnet", "claude-3-opus"
-        ]
-
-        # 验证模型（如果提供了模型名）
-        if "model" in config_data:
-            model = config_data["model"]
-            # 允许任何模型，但给出提示
-            if model not in common_models:
-                print(f"注意: 使用了不常见的模型 '{model}'，请确保API服务支持此模型")
-
-        # 验证 base_url 格式
-        if "openai_base_url" in config_data:
-            base_url = config_data["openai_base_url"]
-            if not base_url.startswith(("https://", "http://")):
-                raise HTTPException(
-                    status_code=400,
-                    detail="Invalid base URL format. Must start with https:// or http://"
-                )
-
-        # 如果提供了API密钥，验证并保存
-        if "openai_api_key" in config_data:
-            api_key = config_data["openai_api_key"]
-
-            # 验证 API Key 格式（支持多种格式）
-            if not api_key.startswith(("sk-", "eyJ", "ak-")):  # OpenAI, JWT token, 其他格式
-                print(f"Warning: API key format unusual for user {user_id}")
-
-            # 保存API密钥
-            api_key_manager.set_key(user_id, api_key)
-
-            # 如果是 DeepSeek，进行特殊验证
-            base_url = config_data.get("openai_base_url", "")
-            if "deepseek" in base_url.lower():
-                try:
-                    is_valid = await deepseek_service.validate_api_key(api_key)
-                    if not is_valid:
-                        print(f"Warning: DeepSeek API key validation failed for user {user_id}")
-                except Exception as e:
-                    print(f"Warning: DeepSeek API key validation error: {str(e)}")
-
-        # 保存配置到内存（扩展 api_key_manager 功能）
-        if not hasattr(api_key_manager, 'configs'):
-            api_key_manager.configs = {}
-
-        api_key_manager.configs[user_id] = {
-            "base_url": config_data.get("openai_base_url", "https://api.openai.com/v1"),
-            "model": config_data.get("model", "gpt-3.5-turbo"),
-            "max_tokens": config_data.get("max_tokens", 2000),
-            "temperature": config_data.get("temperature", 0.7)
-        }
-
-        return {
-            "message": "模型配置更新成功",
-            "is_configured": True,
-            "config": {
-                "base_url": config_data.get("openai_base_url", "https://api.openai.com/v1"),
-                "model": config_data.get("model", "gpt-3.5-turbo"),
-                "max_tokens": config_data.get("max_tokens", 2000),
-                "temperature": config_data.get("temperature", 0.7)
-            }
-        }
+    # 验证模型（如果提供了模型名）
+    if "model" in config_data:
+        model = config_data["model"]
+        # 允许任何模型，但给出提示
+        if model not in _COMMON_MODELS:
+            print(f"注意: 使用了不常见的模型 '{model}'，请确保API服务支持此模型")
+
+    # 验证 base_url 格式
+    if "openai_base_url" in config_data:
+        base_url = config_data["openai_base_url"]
+        if not base_url.startswith(_BASE_URL_SCHEMES):
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid base URL format. Must start with https:// or http://"
+            )
+
+    # 如果提供了API密钥，验证并保存
+    validate_task = None
+    if "openai_api_key" in config_data:
+        api_key = config_data["openai_api_key"]
+
+        # 验证 API Key 格式（支持多种格式）
+        if not api_key.startswith(_API_KEY_PREFIXES):
+            print(f"Warning: API key format unusual for user {user_id}")
+
+        # 如果是 DeepSeek，进行特殊验证 (先发起，与后续的配置保存并发进行)
+        base_url = config_data.get("openai_base_url", "")
+        if "deepseek" in base_url.lower():
+            validate_task = asyncio.create_task(_validate_api_key_cached(api_key))
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to update model config: {str(e)}")
+        # 保存API密钥
+        api_key_manager.set_key(user_id, api_key)
+
+    # 保存配置到内存
+    stored_config = {
+        "base_url": config_data.get("openai_base_url", "https://api.openai.com/v1"),
+        "model": config_data.get("model", "gpt-3.5-turbo"),
+        "max_tokens": config_data.get("max_tokens", 2000),
+        "temperature": config_data.get("temperature", 0.7)
+    }
+    await asyncio.to_thread(api_key_manager.set_config, user_id, stored_config)
+    _invalidate_user_cache(user_id)
+
+    if validate_task is not None:
+        try:
+            is_valid = await validate_task
+            if not is_valid:
+                print(f"Warning: DeepSeek API key validation failed for user {user_id}")
+        except Exception as e:
+            print(f"Warning: DeepSeek API key validation error: {str(e)}")
+
+    return {
+        "message": "模型配置更新成功",
+        "is_configured": True,
+        "config": stored_config
+    }
 
 @router.post("/config/test-connection")
 async def test_connection(
@@ -264,10 +580,7 @@ async def test_connection(
     支持任何 OpenAI 兼容的 API 服务
     """
     try:
-        import time
-        import aiohttp
-        import json
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
 
         # 获取测试参数
         api_key = test_config.get("openai_api_key")
@@ -282,79 +595,104 @@ async def test_connection(
 
         # 构建请求
         if not base_url.endswith('/chat/completions'):
-            chat_url = f"{base_url.rstrip('/')}/chat/completions"
+            api_base = base_url.rstrip('/')
+            chat_url = f"{api_base}/chat/completions"
         else:
+            api_base = base_url[:-len('/chat/completions')]
             chat_url = base_url
 
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+        # /models 与对话请求共用同一份请求头；json= 发送时 aiohttp 会自动补上 Content-Type
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        # 先查询 /models：只需一次往返且不产生推理费用，模型在列表中即视为连接成功
+        model_ids = await _fetch_model_ids(f"{api_base}/models", api_key, headers)
+        if model_ids is not None and model in model_ids:
+            return {
+                "success": True,
+                "message": "API 连接测试成功",
+                "model_info": {
+                    "model": model,
+                    "available": True,
+                    "response_time_ms": (time.monotonic_ns() - start_ns) // 1_000_000,
+                    "base_url": base_url
+                },
+                "test_response": {
+                    "content": f"Model '{model}' is listed by /models",
+                    "usage": {}
+                }
+            }
 
         test_payload = {
             "model": model,
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": "Hello! This is a connection test. Please respond briefly."}
-            ],
+            "messages": _TEST_MESSAGES,
             "max_tokens": 20,
             "temperature": 0.1
         }
 
-        # 发送测试请求
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                chat_url,
-                headers=headers,
-                json=test_payload,
-                timeout=aiohttp.ClientTimeout(total=30)
-            ) as response:
-                response_data = await response.json()
-
+        # 发送测试请求 (复用共享连接池)
+        session = get_http_session()
+        async with session.post(
+            chat_url,
+            headers=headers,
+            json=test_payload,
+            timeout=TEST_CONNECTION_TIMEOUT
+        ) as response:
+            raw = await _read_limited(response, TEST_RESPONSE_MAX_BYTES)
+            try:
+                response_data = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                # 非 JSON 响应：错误状态码按状态码处理，200 则视为异常响应
                 if response.status == 200:
-                    # 成功
-                    response_time_ms = int((time.time() - start_time) * 1000)
-
-                    # 获取响应内容
-                    choices = response_data.get("choices", [])
-                    if choices:
-                        content = choices[0].get("message", {}).get("content", "")
-                    else:
-                        content = "Test successful"
-
-                    usage = response_data.get("usage", {})
-
-                    return {
-                        "success": True,
-                        "message": "API 连接测试成功",
-                        "model_info": {
-                            "model": model,
-                            "available": True,
-                            "response_time_ms": response_time_ms,
-                            "base_url": base_url
-                        },
-                        "test_response": {
-                            "content": content[:100] + "..." if len(content) > 100 else content,
-                            "usage": usage
-                        }
+                    raise HTTPException(status_code=502, detail="API returned a non-JSON response")
+                response_data = {}
+
+            if response.status == 200:
+                # 成功
+                response_time_ms = (time.monotonic_ns() - start_ns) // 1_000_000
+
+                # 获取响应内容
+                content = _extract_content(response_data) or "Test successful"
+                # 短内容直接返回原字符串，只有超长时才截断拼接
+                preview = content if len(content) <= 100 else content[:100] + "..."
+
+                usage = response_data.get("usage", {})
+
+                return {
+                    "success": True,
+                    "message": "API 连接测试成功",
+                    "model_info": {
+                        "model": model,
+                        "available": True,
+                        "response_time_ms": response_time_ms,
+                        "base_url": base_url
+                    },
+                    "test_response": {
+                        "content": preview,
+                        "usage": usage
                     }
+                }
+            else:
+                # 错误处理
+                # 上游的 error 字段可能是对象也可能是字符串，响应体也不一定是对象
+                error = response_data.get("error") if isinstance(response_data, dict) else None
+                if isinstance(error, dict):
+                    error_detail = error.get("message") or f"HTTP {response.status}"
+                else:
+                    error_detail = error if isinstance(error, str) and error else f"HTTP {response.status}"
+                if response.status == 401:
+                    raise HTTPException(status_code=400, detail="Invalid API key. Please check your API key.")
+                elif response.status == 404:
+                    raise HTTPException(status_code=400, detail=f"Model '{model}' not found or not supported by this API.")
+                elif response.status == 429:
+                    raise HTTPException(status_code=429, detail="API rate limit exceeded. Please try again later.")
                 else:
-                    # 错误处理
-                    error_detail = response_data.get("error", {}).get("message", f"HTTP {response.status}")
-                    if response.status == 401:
-                        raise HTTPException(status_code=400, detail="Invalid API key. Please check your API key.")
-                    elif response.status == 404:
-                        raise HTTPException(status_code=400, detail=f"Model '{model}' not found or not supported by this API.")
-                    elif response.status == 429:
-                        raise HTTPException(status_code=429, detail="API rate limit exceeded. Please try again later.")
-                    else:
-                        raise HTTPException(status_code=500, detail=f"API connection test failed: {error_detail}")
+                    raise HTTPException(status_code=500, detail=f"API connection test failed: {error_detail}")
 
     except HTTPException:
         raise
-    except asyncio.TimeoutError:
-        raise HTTPException(status_code=500, detail="Connection test timed out. Please check the API URL and network connection.")
-    except Exception as e:
+    except (asyncio.TimeoutError, aiohttp.ServerTimeoutError):
+        raise HTTPException(status_code=504, detail="Connection test timed out. Please check the API URL and network connection.")
+    except aiohttp.ClientError as e:
         error_msg = str(e)
         if "unauthorized" in error_msg.lower() or "401" in error_msg:
             raise HTTPException(status_code=400, detail="Invalid API key. Please check your API key.")
@@ -363,188 +701,180 @@ async def test_connection(
         else:
             raise HTTPException(status_code=500, detail=f"API connection test failed: {error_msg}")
 
+def _build_system_config(has_key: bool) -> SystemConfigResponse:
+    """构建系统配置概览"""
+    available_models = deepseek_service.get_available_models()
+    
+    # 确定服务状态
+    if has_key:
+        service_status = "ready"
+    else:
+        service_status = "api_key_required"
+    
+    return SystemConfigResponse(
+        available_models=available_models,
+        current_model="deepseek-chat",
+        api_key_configured=has_key,
+        service_status=service_status
+    )
+
 # 系统配置
 @router.get("/config/system", response_model=SystemConfigResponse)
-def get_system_config(
+async def get_system_config(
     user_id: str = "default"
 ):
     """
     获取系统配置概览
     """
-    try:
-        has_key = api_key_manager.has_key(user_id)
-        available_models = deepseek_service.get_available_models()
-        
-        # 确定服务状态
-        if has_key:
-            service_status = "ready"
-        else:
-            service_status = "api_key_required"
-        
-        return SystemConfigResponse(
-            available_models=available_models,
-            current_model="deepseek-chat",
-            api_key_configured=has_key,
-            service_status=service_status
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get system config: {str(e)}")
+    return _build_system_config(api_key_manager.has_key(user_id))
 
-@router.get("/config/cost-estimate")
-def get_cost_estimate(
+@router.get("/config/cost-estimate", response_model=CostEstimateResponse)
+async def get_cost_estimate(
     input_tokens: int = 1000,
     output_tokens: int = 500
 ):
     """
     获取成本估算
     """
-    try:
-        cost = deepseek_service.estimate_cost(input_tokens, output_tokens)
-        
-        # 不同场景的成本估算
-        scenarios = {
-            "short_conversation": deepseek_service.estimate_cost(500, 200),
-            "medium_conversation": deepseek_service.estimate_cost(1500, 800),
-            "long_conversation": deepseek_service.estimate_cost(3000, 1500),
-            "meeting_hour": deepseek_service.estimate_cost(5000, 3000)  # 假设一小时会议
-        }
-        
-        return {
-            "input_tokens": input_tokens,
-            "output_tokens": output_tokens,
-            "estimated_cost_usd": round(cost, 6),
-            "scenarios": {k: round(v, 6) for k, v in scenarios.items()},
-            "currency": "USD",
-            "last_updated": "2024-01-01"  # TODO: 实际更新时间
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to calculate cost estimate: {str(e)}")
+    cost = input_tokens * _INPUT_PRICE_PER_TOKEN + output_tokens * _OUTPUT_PRICE_PER_TOKEN
+    
+    return CostEstimateResponse(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        estimated_cost_usd=round(cost, 6),
+        scenarios=_COST_SCENARIOS,
+        currency="USD",
+        last_updated="2024-01-01"  # TODO: 实际更新时间
+    )
+
+async def _probe_service_health(user_id: str) -> Dict[str, Any]:
+    """实际探测数据库与 DeepSeek API 的健康状态"""
+    api_key = _resolve_key(user_id)
+    has_key = api_key is not None
+    health_status = {
+        "database": "unknown",
+        "deepseek_api": "unknown",
+        "api_key_status": "configured" if has_key else "missing",
+        "timestamp": _utc_now_iso()
+    }
+    
+    # 数据库与API探测并发执行，各自带超时
+    db_task = asyncio.create_task(
+        asyncio.wait_for(asyncio.to_thread(_ping_database), timeout=HEALTH_PROBE_TIMEOUT)
+    )
+    api_task = None
+    if has_key:
+        # 测试API连接 (如果有密钥)
+        test_service = get_service_for_key(api_key)
+        api_task = asyncio.create_task(
+            asyncio.wait_for(test_service.validate_connectivity(), timeout=HEALTH_PROBE_TIMEOUT)
+        )
+    
+    tasks = [db_task] if api_task is None else [db_task, api_task]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    
+    health_status["database"] = "error" if isinstance(results[0], BaseException) else "healthy"
+    if api_task is not None:
+        health_status["deepseek_api"] = "healthy" if results[1] is True else "error"
+    
+    # 确定总体状态
+    if health_status["database"] == "healthy" and health_status["deepseek_api"] == "healthy":
+        overall_status = "healthy"
+    elif health_status["api_key_status"] == "missing":
+        overall_status = "configuration_required"
+    else:
+        overall_status = "degraded"
+    
+    health_status["overall"] = overall_status
+    
+    return health_status
+
+async def _refresh_service_health(user_id: str) -> Dict[str, Any]:
+    """探测健康状态并写入缓存；API 异常时回退到最近一次健康结果"""
+    started = time.monotonic()
+    health_status = await _probe_service_health(user_id)
+    elapsed = time.monotonic() - started
+    
+    if health_status["overall"] == "healthy":
+        _last_healthy_status[user_id] = health_status
+    elif (health_status["database"] == "healthy"
+          and health_status["deepseek_api"] == "error"
+          and user_id in _last_healthy_status):
+        # 上游暂时异常时返回上一次健康结果，并标记为过期数据
+        health_status = {**_last_healthy_status[user_id], "stale": True}
+    
+    # 探测越慢缓存越久，避免上游变慢时被监控请求持续放大
+    ttl = min(HEALTH_CACHE_MAX_TTL, max(HEALTH_CACHE_TTL, elapsed * HEALTH_CACHE_BACKOFF_FACTOR))
+    _set_cached_response(("health", user_id), health_status, ttl)
+    return health_status
 
 # 健康检查
-@router.get("/config/health")
+@router.get("/config/health", response_model=HealthStatusResponse, response_model_exclude_unset=True)
 async def check_service_health(
     user_id: str = "default"
 ):
     """
     检查服务健康状态
     """
-    try:
-        health_status = {
-            "database": "healthy",  # TODO: 实际检查数据库连接
-            "deepseek_api": "unknown",
-            "api_key_status": "configured" if api_key_manager.has_key(user_id) else "missing",
-            "timestamp": "2024-01-01T00:00:00Z"
-        }
-        
-        # 测试API连接 (如果有密钥)
-        if api_key_manager.has_key(user_id):
-            try:
-                api_key = api_key_manager.get_key(user_id)
-                test_service = deepseek_service.__class__(api_key)
-                await test_service.chat_completion(
-                    messages=[{"role": "user", "content": "test"}],
-                    max_tokens=1
-                )
-                health_status["deepseek_api"] = "healthy"
-            except:
-                health_status["deepseek_api"] = "error"
-        
-        # 确定总体状态
-        if health_status["database"] == "healthy" and health_status["deepseek_api"] == "healthy":
-            overall_status = "healthy"
-        elif health_status["api_key_status"] == "missing":
-            overall_status = "configuration_required"
-        else:
-            overall_status = "degraded"
-        
-        health_status["overall"] = overall_status
-        
-        return health_status
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
+    cached = _get_cached_response(("health", user_id))
+    if cached is not None:
+        return cached
+    
+    # 同一用户的并发请求共享同一次探测，每个缓存周期只有一次请求到达上游
+    probe = _health_probes.get(user_id)
+    if probe is None:
+        probe = asyncio.ensure_future(_refresh_service_health(user_id))
+        _health_probes[user_id] = probe
+        probe.add_done_callback(lambda _: _health_probes.pop(user_id, None))
+    
+    return await asyncio.shield(probe)
 
 # 获取 DeepSeek 模型信息
-@router.get("/config/deepseek-models")
-def get_deepseek_models():
+@router.get("/config/deepseek-models", response_model=DeepSeekModelsResponse)
+async def get_deepseek_models(request: Request):
     """
     获取 DeepSeek 支持的模型列表
     
     根据 DeepSeek API 文档返回最新的模型信息
     """
-    try:
-        models = [
-            {
-                "id": "deepseek-chat",
-                "name": "DeepSeek Chat (V3.1)",
-                "description": "DeepSeek-V3.1 非思考模式，适合日常对话和多数任务",
-                "max_tokens": 4096,
-                "context_length": "128K tokens",
-                "pricing": {
-                    "input": "$0.14 / 1M tokens",
-                    "output": "$0.28 / 1M tokens"
-                },
-                "features": ["general_conversation", "coding", "analysis", "creative_writing"]
-            },
-            {
-                "id": "deepseek-reasoner",
-                "name": "DeepSeek Reasoner (V3.1)",
-                "description": "DeepSeek-V3.1 思考模式，适合复杂推理和问题解决",
-                "max_tokens": 4096,
-                "context_length": "128K tokens",
-                "pricing": {
-                    "input": "$0.55 / 1M tokens",
-                    "output": "$2.19 / 1M tokens"
-                },
-                "features": ["complex_reasoning", "math", "science", "logical_analysis"]
-            }
-        ]
-        
-        return {
-            "models": models,
-            "default_model": "deepseek-chat",
-            "api_base_url": "https://api.deepseek.com",
-            "documentation": "https://api-docs.deepseek.com/zh-cn/",
-            "updated_at": "2024-12-26"  # DeepSeek V3 发布日期
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get DeepSeek models: {str(e)}")
+    headers = {"ETag": _DEEPSEEK_MODELS_ETAG, "Cache-Control": STATIC_CONFIG_CACHE_CONTROL}
+    if _not_modified(request, _DEEPSEEK_MODELS_ETAG):
+        return Response(status_code=304, headers=headers)
+    return Response(content=_DEEPSEEK_MODELS_BYTES, media_type="application/json", headers=headers)
 
 # 导出配置
-@router.get("/config/export")
-def export_system_config():
+@router.get("/config/export", response_model=ExportConfigResponse)
+async def export_system_config(request: Request):
     """
     导出系统配置 (不包含敏感信息)
+    
+    导出时间戳精确到分钟，ETag 由配置内容和分钟桶共同决定，同一分钟内重复导出返回 304
     """
-    try:
-        config = {
-            "version": "2.0.0",
-            "ai_provider": {
-                "name": "DeepSeek",
-                "base_url": "https://api.deepseek.com",
-                "default_model": "deepseek-chat",
-                "supported_models": ["deepseek-chat", "deepseek-reasoner"]
-            },
-            "limits": {
-                "max_tokens_per_request": 4096,
-                "max_participants_per_meeting": 10,
-                "max_messages_per_meeting": 1000,
-                "context_length": "128K tokens"
-            },
-            "features": {
-                "agent_customization": True,
-                "meeting_replay": True,
-                "real_time_collaboration": True,
-                "analytics": True,
-                "deepseek_integration": True
-            },
-            "export_timestamp": datetime.utcnow().isoformat()
-        }
-        
-        return config
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to export config: {str(e)}")
\ No newline at end of file
+    bucket = int(time.time()) // EXPORT_TIMESTAMP_BUCKET_SECONDS
+    etag = f'"{_EXPORT_CONFIG_HASH}-{bucket}"'
+    headers = {"ETag": etag, "Cache-Control": EXPORT_CONFIG_CACHE_CONTROL}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    body = _export_config_body(bucket)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# 配置页初始化数据
+@router.get("/config/bootstrap")
+async def get_config_bootstrap(
+    user_id: str = "default"
+):
+    """
+    一次返回配置页所需的全部数据
+
+    合并 /config/system、/config/models、/config/deepseek-key、/config/deepseek-models，
+    减少前端请求次数，各部分共用一次密钥检查
+    """
+    has_key = api_key_manager.has_key(user_id)
+    
+    return {
+        "system": _build_system_config(has_key),
+        "models": await _build_model_config(user_id, has_key),
+        "key_status": _build_key_status(user_id, has_key),
+        "deepseek_models": _DEEPSEEK_MODELS_RESPONSE
+    }
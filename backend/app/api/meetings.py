@@ -299,10 +299,9 @@ async def update_meeting_status(
         
         # 如果状态变更为active，自动启动智能体对话
         if new_status == "active":
-            from .meeting_stream import run_agent_conversation, active_conversations
-            if meeting_id not in active_conversations:
-                active_conversations.add(meeting_id)
-                background_tasks.add_task(run_agent_conversation, meeting_id, meeting_service.db)
+            from .meeting_stream import run_agent_conversation, claim_conversation
+            if await claim_conversation(meeting_id):
+                background_tasks.add_task(run_agent_conversation, meeting_id)
                 logger.info(f"Auto-started agent conversation for meeting {meeting_id} due to status change")
                 
                 # 广播会议启动事件
@@ -314,10 +313,9 @@ async def update_meeting_status(
         
         # 如果状态变更为paused或completed，停止对话
         elif new_status in ["paused", "completed", "cancelled"]:
-            from .meeting_stream import active_conversations
-            if meeting_id in active_conversations:
-                active_conversations.discard(meeting_id)
-                logger.info(f"Stopped agent conversation for meeting {meeting_id} due to status change to {new_status}")
+            from .meeting_stream import release_conversation
+            await release_conversation(meeting_id)
+            logger.info(f"Stopped agent conversation for meeting {meeting_id} due to status change to {new_status}")
         
         return {
             "id": meeting.id,
@@ -371,10 +369,9 @@ async def start_meeting(
         })
         
         # 自动启动智能体对话
-        from .meeting_stream import run_agent_conversation, active_conversations
-        if meeting_id not in active_conversations:
-            active_conversations.add(meeting_id)
-            background_tasks.add_task(run_agent_conversation, meeting_id, meeting_service.db)
+        from .meeting_stream import run_agent_conversation, claim_conversation
+        if await claim_conversation(meeting_id):
+            background_tasks.add_task(run_agent_conversation, meeting_id)
             logger.info(f"Auto-started agent conversation for meeting {meeting_id}")
         
         return {"message": "Meeting started and conversation initiated", "meeting": meeting.to_dict()}
@@ -57,7 +57,7 @@ def get_data_overview(db: Session = Depends(get_database_session)):
         raise HTTPException(status_code=500, detail=f"Failed to get data overview: {str(e)}")
 
 @router.get("/test/api-status")
-def get_api_status():
+async def get_api_status():
     """
     获取API接口状态概览
     """
@@ -4,8 +4,10 @@
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import Generator, Iterator
+from contextlib import contextmanager
 import os
 
 # 导入统一的 Base
@@ -24,7 +26,31 @@ from .message import (
 
 # 数据库配置
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./crewai_meeting.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+
+# 连接池配置：同步端点在线程池中并发执行，默认的 5+10 个连接在并发请求下容易耗尽并排队超时
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+
+def _is_sqlite_memory(url) -> bool:
+    """SQLite 内存数据库：未指定数据库文件、:memory: 或 URI 参数 mode=memory"""
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+_database_url = make_url(DATABASE_URL)
+
+if _database_url.get_backend_name() == "sqlite":
+    engine_options = {"connect_args": {"check_same_thread": False}}
+    # 内存数据库使用 SingletonThreadPool，不支持连接池大小配置
+    if not _is_sqlite_memory(_database_url):
+        engine_options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+else:
+    engine_options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,  # 复用前检测失效连接
+        "pool_recycle": 1800  # 30 分钟回收连接，避免被服务端断开
+    }
+
+engine = create_engine(DATABASE_URL, **engine_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def create_database():
@@ -41,6 +67,19 @@ def get_database_session() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+@contextmanager
+def get_database_session_context() -> Iterator[Session]:
+    """
+    获取短生命周期的数据库会话，供后台任务按需使用
+
+    提交后不过期已加载的对象，会话关闭后仍可读取其字段
+    """
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        yield db
+    finally:
+        db.close()
+
 def init_sample_data(db: Session):
     """初始化示例数据"""
     # 检查是否已有数据
@@ -242,5 +281,6 @@ __all__ = [
     "SessionLocal", 
     "create_database",
     "get_database_session",
+    "get_database_session_context",
     "init_sample_data"
 ]
\ No newline at end of file
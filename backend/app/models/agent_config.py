@@ -1,8 +1,15 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, Optional
+from threading import Lock
+from typing import Dict, Any, Optional, Tuple
 from .base import Base
 
+# to_dict() 结果缓存，键为 (id, updated_at)；配置更新后 updated_at 变化，旧条目按 LRU 自然淘汰
+_TO_DICT_CACHE_SIZE = 4096
+_to_dict_cache: "OrderedDict[Tuple[int, Optional[datetime]], Dict[str, Any]]" = OrderedDict()
+_to_dict_cache_lock = Lock()
+
 class AgentConfig(Base):
     """
     Agent 配置数据模型
@@ -78,6 +85,26 @@ class AgentConfig(Base):
             "created_by": self.created_by
         }
     
+    def to_dict_cached(self) -> Dict[str, Any]:
+        """
+        转换为字典格式 (带缓存，用于只读的列表接口)
+
+        返回的字典在多个请求间共享，调用方不得修改
+        """
+        key = (self.id, self.updated_at)
+        with _to_dict_cache_lock:
+            cached = _to_dict_cache.get(key)
+            if cached is not None:
+                _to_dict_cache.move_to_end(key)
+                return cached
+        
+        data = self.to_dict()
+        with _to_dict_cache_lock:
+            _to_dict_cache[key] = data
+            if len(_to_dict_cache) > _TO_DICT_CACHE_SIZE:
+                _to_dict_cache.popitem(last=False)
+        return data
+    
     @staticmethod
     def get_default_personality_traits() -> Dict[str, str]:
         """获取默认个性特征模板"""
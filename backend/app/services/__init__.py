@@ -3,7 +3,15 @@
 包含所有业务逻辑服务
 """
 
-from .deepseek_service import DeepSeekService, APIKeyManager, deepseek_service, api_key_manager
+from .deepseek_service import (
+    DeepSeekService,
+    APIKeyManager,
+    deepseek_service,
+    api_key_manager,
+    get_http_session,
+    close_http_session,
+    get_service_for_key
+)
 from .agent_service import AgentService
 from .meeting_service import MeetingService
 
@@ -12,6 +20,9 @@ __all__ = [
     "APIKeyManager", 
     "deepseek_service",
     "api_key_manager",
+    "get_http_session",
+    "close_http_session",
+    "get_service_for_key",
     "AgentService",
     "MeetingService"
 ]
\ No newline at end of file
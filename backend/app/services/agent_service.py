@@ -1,13 +1,22 @@
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+from threading import Lock
+import asyncio
 import logging
+import time
 
 from ..models.agent_config import AgentConfig
 from .deepseek_service import deepseek_service
 
 logger = logging.getLogger(__name__)
 
+# Agent详情缓存 (进程内)：agent_id -> (过期时间, Agent字典)，写操作时主动失效
+AGENT_CACHE_TTL = 60  # 秒
+AGENT_CACHE_MAXSIZE = 2048
+_agent_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+_agent_cache_lock = Lock()
+
 class AgentService:
     """
     Agent管理服务
@@ -17,6 +26,16 @@ class AgentService:
     def __init__(self, db: Session):
         self.db = db
     
+    def _commit_and_refresh(self, agent: AgentConfig) -> None:
+        """提交当前事务并刷新Agent对象 (阻塞操作，在线程中执行)"""
+        self.db.commit()
+        self.db.refresh(agent)
+    
+    def _add_and_commit(self, agent: AgentConfig) -> None:
+        """新增Agent并提交 (阻塞操作，在线程中执行)"""
+        self.db.add(agent)
+        self._commit_and_refresh(agent)
+    
     async def create_agent(
         self,
         agent_data: Dict[str, Any],
@@ -61,9 +80,8 @@ class AgentService:
                 created_by=created_by
             )
             
-            self.db.add(agent)
-            self.db.commit()
-            self.db.refresh(agent)
+            # 数据库写入放到线程中执行，避免阻塞事件循环
+            await asyncio.to_thread(self._add_and_commit, agent)
             
             logger.info(f"Created agent: {agent.name} (ID: {agent.id})")
             return agent
@@ -74,8 +92,48 @@ class AgentService:
             raise
     
     def get_agent_by_id(self, agent_id: int) -> Optional[AgentConfig]:
-        """根据ID获取Agent配置"""
-        return self.db.query(AgentConfig).filter(AgentConfig.id == agent_id).first()
+        """根据ID获取Agent配置 (同一会话内重复获取直接命中 identity map，不再查询数据库)"""
+        return self.db.get(AgentConfig, agent_id)
+    
+    def get_agents_by_ids(self, agent_ids: List[int]) -> Dict[int, AgentConfig]:
+        """按ID批量获取Agent配置 (单次 IN 查询)，返回 agent_id -> Agent 的映射，不存在的ID不包含在结果中"""
+        if not agent_ids:
+            return {}
+        agents = self.db.query(AgentConfig).filter(AgentConfig.id.in_(set(agent_ids))).all()
+        return {agent.id: agent for agent in agents}
+    
+    def get_agent_dict(self, agent_id: int) -> Optional[Dict[str, Any]]:
+        """
+        根据ID获取Agent配置字典 (带TTL缓存，用于只读接口)
+
+        返回的字典在多个请求间共享，调用方不得修改
+        """
+        now = time.monotonic()
+        with _agent_cache_lock:
+            cached = _agent_cache.get(agent_id)
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        agent = self.get_agent_by_id(agent_id)
+        if not agent:
+            return None
+        
+        data = agent.to_dict()
+        with _agent_cache_lock:
+            if len(_agent_cache) >= AGENT_CACHE_MAXSIZE:
+                # 先清理过期条目，仍然超限时清空
+                for key in [k for k, (expires_at, _) in _agent_cache.items() if expires_at <= now]:
+                    del _agent_cache[key]
+                if len(_agent_cache) >= AGENT_CACHE_MAXSIZE:
+                    _agent_cache.clear()
+            _agent_cache[agent_id] = (now + AGENT_CACHE_TTL, data)
+        return data
+    
+    @staticmethod
+    def invalidate_agent_cache(agent_id: int) -> None:
+        """使指定Agent的缓存失效"""
+        with _agent_cache_lock:
+            _agent_cache.pop(agent_id, None)
     
     def get_agents(
         self, 
@@ -126,7 +184,7 @@ class AgentService:
     ) -> Optional[AgentConfig]:
         """更新Agent配置"""
         try:
-            agent = self.get_agent_by_id(agent_id)
+            agent = await asyncio.to_thread(self.get_agent_by_id, agent_id)
             if not agent:
                 return None
             
@@ -143,8 +201,8 @@ class AgentService:
             
             agent.updated_at = datetime.utcnow()
             
-            self.db.commit()
-            self.db.refresh(agent)
+            await asyncio.to_thread(self._commit_and_refresh, agent)
+            self.invalidate_agent_cache(agent_id)
             
             logger.info(f"Updated agent: {agent.name} (ID: {agent.id})")
             return agent
@@ -165,6 +223,7 @@ class AgentService:
             agent.updated_at = datetime.utcnow()
             
             self.db.commit()
+            self.invalidate_agent_cache(agent_id)
             
             logger.info(f"Deactivated agent: {agent.name} (ID: {agent.id})")
             return True
@@ -183,6 +242,7 @@ class AgentService:
             
             self.db.delete(agent)
             self.db.commit()
+            self.invalidate_agent_cache(agent_id)
             
             logger.info(f"Hard deleted agent: {agent_id}")
             return True
@@ -203,7 +263,7 @@ class AgentService:
         用于在配置阶段测试Agent的表现
         """
         try:
-            agent = self.get_agent_by_id(agent_id)
+            agent = await asyncio.to_thread(self.get_agent_by_id, agent_id)
             if not agent:
                 raise ValueError(f"Agent {agent_id} not found")
             
@@ -1,12 +1,50 @@
 import aiohttp
+import asyncio
+import functools
 import json
 import logging
 from typing import Dict, Any, List, Optional, AsyncGenerator
 from datetime import datetime
 import os
 
+from .redis_client import redis_client
+
 logger = logging.getLogger(__name__)
 
+# DeepSeek V3.1 定价 (根据官方文档)：模型 -> (每百万输入token美元, 每百万输出token美元)
+MODEL_PRICING = {
+    "deepseek-chat": (0.14, 0.28),
+    "deepseek-reasoner": (0.55, 2.19)
+}
+
+# 校验API密钥时的超时时间，校验位于注册路径上，不应等满常规请求的30秒
+API_KEY_VALIDATION_TIMEOUT = 10  # 秒
+
+# 所有 DeepSeekService 实例共享的HTTP会话，复用连接池避免每次调用重新握手
+_http_session: Optional[aiohttp.ClientSession] = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """获取共享的HTTP会话 (需在事件循环中调用)"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            # DNS 结果缓存 5 分钟 (默认仅 10 秒)，空闲连接保留 60 秒
+            connector=aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=32,
+                ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+        )
+    return _http_session
+
+async def close_http_session() -> None:
+    """关闭共享的HTTP会话 (应用关闭时调用)"""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
 class DeepSeekService:
     """
     DeepSeek 模型服务
@@ -24,6 +62,19 @@ class DeepSeekService:
         if not self.api_key:
             logger.warning("DeepSeek API key not provided. Service will be limited.")
     
+    def _resolve_api_key(self) -> str:
+        """获取调用使用的API密钥：优先当前实例的密钥，否则从全局API密钥管理器获取"""
+        api_key = self.api_key
+        if not api_key:
+            # 尝试从全局API密钥管理器获取
+            global api_key_manager
+            if api_key_manager and api_key_manager.has_key("default"):
+                api_key = api_key_manager.get_key("default")
+
+        if not api_key:
+            raise ValueError("DeepSeek API key is required")
+        return api_key
+
     async def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -47,16 +98,7 @@ class DeepSeekService:
         Returns:
             API响应结果
         """
-        # 动态获取API密钥，如果当前实例没有密钥的话
-        api_key = self.api_key
-        if not api_key:
-            # 尝试从全局API密钥管理器获取
-            global api_key_manager
-            if api_key_manager and api_key_manager.has_key("default"):
-                api_key = api_key_manager.get_key("default")
-
-        if not api_key:
-            raise ValueError("DeepSeek API key is required")
+        api_key = self._resolve_api_key()
         
         # 根据Agent配置调整参数
         if agent_config:
@@ -77,18 +119,18 @@ class DeepSeekService:
         }
         
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"DeepSeek API error {response.status}: {error_text}")
+            async with get_http_session().post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return result
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"DeepSeek API error {response.status}: {error_text}")
         
         except Exception as e:
             logger.error(f"DeepSeek API call failed: {str(e)}")
@@ -98,6 +140,56 @@ class DeepSeekService:
                 return None
             raise
     
+    async def chat_completion_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "deepseek-chat",
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> AsyncGenerator[str, None]:
+        """
+        流式调用 DeepSeek Chat Completion API
+
+        Yields:
+            模型生成的增量文本 (不含空片段)
+
+        请求失败时直接抛出异常，由调用方决定回退方案
+        """
+        api_key = self._resolve_api_key()
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+
+        async with get_http_session().post(
+            f"{self.base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {api_key}"},
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise Exception(f"DeepSeek API error {response.status}: {error_text}")
+
+            async for line in response.content:
+                if not line.startswith(b"data: "):
+                    continue
+                data = line[6:].strip()
+                if data == b"[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                choices = chunk.get("choices")
+                if choices:
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+    
     async def generate_agent_response(
         self,
         context: str,
@@ -206,26 +298,25 @@ class DeepSeekService:
                 "stream": True
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    async for line in response.content:
-                        line = line.decode('utf-8').strip()
-                        if line.startswith('data: '):
-                            data = line[6:]  # 移除 'data: ' 前缀
-                            if data == '[DONE]':
-                                break
-                            try:
-                                chunk = json.loads(data)
-                                if 'choices' in chunk and len(chunk['choices']) > 0:
-                                    delta = chunk['choices'][0].get('delta', {})
-                                    if 'content' in delta:
-                                        yield delta['content']
-                            except json.JSONDecodeError:
-                                continue
+            async with get_http_session().post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload
+            ) as response:
+                async for line in response.content:
+                    line = line.decode('utf-8').strip()
+                    if line.startswith('data: '):
+                        data = line[6:]  # 移除 'data: ' 前缀
+                        if data == '[DONE]':
+                            break
+                        try:
+                            chunk = json.loads(data)
+                            if 'choices' in chunk and len(chunk['choices']) > 0:
+                                delta = chunk['choices'][0].get('delta', {})
+                                if 'content' in delta:
+                                    yield delta['content']
+                        except json.JSONDecodeError:
+                            continue
                                 
         except Exception as e:
             logger.error(f"Streaming response failed: {str(e)}")
@@ -343,15 +434,31 @@ class DeepSeekService:
             "confidence": 0.8  # TODO: 添加置信度评估
         }
     
+    async def validate_connectivity(self) -> bool:
+        """
+        通过 GET /models 检查API连通性与密钥有效性
+        
+        只需一次往返且不触发模型推理，适合密钥校验和健康检查；
+        需要端到端推理测试时再使用 chat_completion
+        """
+        if not self.api_key:
+            raise ValueError("DeepSeek API key is required")
+        
+        async with get_http_session().get(
+            f"{self.base_url}/models",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as response:
+            return response.status == 200
+    
     async def validate_api_key(self, api_key: str) -> bool:
         """验证API密钥是否有效"""
-        test_service = DeepSeekService(api_key)
+        test_service = get_service_for_key(api_key)
         try:
-            await test_service.chat_completion(
-                messages=[{"role": "user", "content": "Hello"}],
-                max_tokens=10
+            return await asyncio.wait_for(
+                test_service.validate_connectivity(),
+                timeout=API_KEY_VALIDATION_TIMEOUT
             )
-            return True
         except Exception as e:
             logger.error(f"API key validation failed: {str(e)}")
             return False
@@ -365,13 +472,8 @@ class DeepSeekService:
     
     def estimate_cost(self, input_tokens: int, output_tokens: int, model: str = "deepseek-chat") -> float:
         """估算API调用成本 (USD) - 根据 DeepSeek 官方定价"""
-        # DeepSeek V3.1 定价 (根据官方文档)
-        if model == "deepseek-reasoner":
-            input_cost_per_1m = 0.55   # $0.55 / 1M input tokens
-            output_cost_per_1m = 2.19  # $2.19 / 1M output tokens
-        else:  # deepseek-chat 默认
-            input_cost_per_1m = 0.14   # $0.14 / 1M input tokens  
-            output_cost_per_1m = 0.28  # $0.28 / 1M output tokens
+        # 未知模型按 deepseek-chat 默认定价计算
+        input_cost_per_1m, output_cost_per_1m = MODEL_PRICING.get(model, MODEL_PRICING["deepseek-chat"])
         
         input_cost = (input_tokens / 1000000) * input_cost_per_1m
         output_cost = (output_tokens / 1000000) * output_cost_per_1m
@@ -379,11 +481,37 @@ class DeepSeekService:
         return input_cost + output_cost
 
 
+# 多 worker 部署时，模型配置写入该 Redis 哈希以在进程间共享 (需设置 REDIS_URL)
+MODEL_CONFIG_REDIS_KEY = "crewai:cfg"
+
 class APIKeyManager:
     """API密钥管理器"""
     
     def __init__(self):
         self._keys = {}
+        # 用户的模型配置 (base_url/model/max_tokens/temperature)
+        self.configs: Dict[str, Dict[str, Any]] = {}
+        self._redis = redis_client
+    
+    def set_config(self, user_id: str, config: Dict[str, Any]) -> None:
+        """保存用户的模型配置，配置了 Redis 时同时写入共享存储"""
+        self.configs[user_id] = config
+        if self._redis is not None:
+            try:
+                self._redis.hset(MODEL_CONFIG_REDIS_KEY, user_id, json.dumps(config))
+            except Exception as e:
+                logger.warning(f"Failed to write model config to Redis: {str(e)}")
+    
+    def get_config(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """获取用户的模型配置，配置了 Redis 时优先读取共享存储"""
+        if self._redis is not None:
+            try:
+                raw = self._redis.hget(MODEL_CONFIG_REDIS_KEY, user_id)
+                if raw:
+                    self.configs[user_id] = json.loads(raw)
+            except Exception as e:
+                logger.warning(f"Failed to read model config from Redis: {str(e)}")
+        return self.configs.get(user_id)
     
     def set_key(self, user_id: str, api_key: str) -> None:
         """设置用户的API密钥"""
@@ -402,6 +530,11 @@ class APIKeyManager:
         """检查用户是否有API密钥"""
         return user_id in self._keys or bool(os.getenv("DEEPSEEK_API_KEY"))
 
+@functools.lru_cache(maxsize=128)
+def get_service_for_key(api_key: str) -> DeepSeekService:
+    """按API密钥获取复用的服务实例 (底层共用同一个HTTP连接池)"""
+    return DeepSeekService(api_key)
+
 # 全局实例
 deepseek_service = DeepSeekService()
 api_key_manager = APIKeyManager()
\ No newline at end of file
@@ -1,5 +1,6 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import logging
 import asyncio
@@ -442,6 +443,13 @@ class MeetingService:
             MeetingMessage.meeting_id == meeting_id
         ).order_by(MeetingMessage.created_at.desc()).offset(skip).limit(limit).all()
     
+    def get_message_version(self, meeting_id: int) -> Tuple[int, Optional[int]]:
+        """会议消息的版本标识 (消息数, 最大ID)，用于判断缓存的消息列表是否过期"""
+        count, max_id = self.db.query(
+            func.count(MeetingMessage.id), func.max(MeetingMessage.id)
+        ).filter(MeetingMessage.meeting_id == meeting_id).one()
+        return count, max_id
+    
     async def get_next_speaker(self, meeting_id: int) -> Optional[Dict[str, Any]]:
         """获取下一个发言者 (智能调度)"""
         try:
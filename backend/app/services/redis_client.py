@@ -0,0 +1,24 @@
+"""
+共享 Redis 客户端
+配置 REDIS_URL 后，会议状态、消息广播与模型配置共用同一个客户端 (同一个连接池)
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+def _create_redis_client():
+    """根据 REDIS_URL 创建 Redis 客户端，未配置或不可用时返回 None (仅使用进程内存)"""
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        return None
+    try:
+        import redis
+        return redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    except Exception as e:
+        logger.warning(f"Redis unavailable, shared state stays in process memory: {str(e)}")
+        return None
+
+# 每个进程只创建一个客户端，未配置 REDIS_URL 时为 None
+redis_client = _create_redis_client()
@@ -1,12 +1,19 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from anyio import to_thread
 from sqlalchemy.orm import Session
+import logging
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
 
+# FastAPI 同步 (def) 端点运行在 anyio 线程池中，默认仅 40 个线程
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "100"))
+
 # 导入所有API路由
 from app.api.routes import router as legacy_router
 from app.api.agents import router as agents_router
@@ -17,33 +24,65 @@ from app.api.meeting_stream import router as meeting_stream_router
 
 # 导入数据库相关
 from app.models import create_database, get_database_session, init_sample_data
+from app.services.deepseek_service import close_http_session
 
 app = FastAPI(
     title="CrewAI Multi-Agent Meeting System",
     description="智能多Agent会议协作系统 - 支持Agent配置、会议管理、实时讨论和历史回放",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
+logger = logging.getLogger(__name__)
+
+# 允许跨域访问的前端地址
+CORS_ALLOW_ORIGINS = [
+    "http://localhost:3000",  # Next.js dev server
+    "http://127.0.0.1:3000",
+    "http://localhost:3001",  # 备用端口
+]
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",  # Next.js dev server
-        "http://127.0.0.1:3000",
-        "http://localhost:3001",  # 备用端口
-    ],
+    allow_origins=CORS_ALLOW_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
     expose_headers=["*"]
 )
 
+# 未处理异常统一返回 500，各接口不必再单独包裹 try/except
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """
+    将未捕获的异常转换为 JSON 格式的 500 响应
+
+    该处理器运行在 CORSMiddleware 之外，需自行补上跨域响应头，否则前端只会看到跨域失败；
+    异常详情只写日志，不返回给客户端
+    """
+    logger.exception(f"Unhandled error on {request.method} {request.url.path}")
+    headers = {}
+    origin = request.headers.get("origin")
+    if origin in CORS_ALLOW_ORIGINS:
+        headers = {
+            "Access-Control-Allow-Origin": origin,
+            "Access-Control-Allow-Credentials": "true",
+            "Vary": "Origin"
+        }
+    return ORJSONResponse(
+        status_code=500,
+        content={"detail": "Internal server error"},
+        headers=headers
+    )
+
 # 数据库初始化事件
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化数据库"""
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     try:
         create_database()
         # 初始化示例数据
@@ -53,6 +92,11 @@ async def startup_event():
     except Exception as e:
         print(f"Database initialization failed: {str(e)}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时释放共享的HTTP连接池"""
+    await close_http_session()
+
 # 包含所有API路由
 app.include_router(legacy_router, prefix="/api/v1", tags=["Legacy"])
 app.include_router(agents_router, prefix="/api/v1", tags=["Agent管理"])
@@ -94,15 +138,26 @@ async def health_check(db: Session = Depends(get_database_session)):
             "status": "healthy",
             "version": "2.0.0",
             "database": "connected",
-            "timestamp": "2024-01-01T00:00:00Z"
+            "timestamp": datetime.utcnow().isoformat() + "Z"
         }
     except Exception as e:
         return {
             "status": "unhealthy",
             "error": str(e),
-            "timestamp": "2024-01-01T00:00:00Z"
+            "timestamp": datetime.utcnow().isoformat() + "Z"
         }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # 安装 uvicorn[standard] 后 loop/http 为 auto 时会自动选用 uvloop 和 httptools
+    # 注意：会议流状态在配置 REDIS_URL 后跨进程共享，API密钥等状态仍保存在进程内存中，多 worker 部署前需先将其外置
+    workers = int(os.getenv("UVICORN_WORKERS", "1"))
+    uvicorn.run(
+        app if workers == 1 else "main:app",
+        host="0.0.0.0",
+        port=8001,
+        loop="auto",
+        http="auto",
+        workers=workers,
+        backlog=2048
+    )
\ No newline at end of file
@@ -59,12 +59,14 @@ export default function MeetingDetailPanel({ meetingId, onClose }: MeetingDetail
   const [visibleMessages, setVisibleMessages] = useState<Message[]>([]);
 
   // 打字机效果状态
-  const [typingMessages, setTypingMessages] = useState<Map<number, string>>(new Map());
-  const [isTyping, setIsTyping] = useState<Set<number>>(new Set());
+  const [typingMessages, setTypingMessages] = useState<Map<number | string, string>>(new Map());
+  const [isTyping, setIsTyping] = useState<Set<number | string>>(new Set());
 
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const eventSourceRef = useRef<EventSource | null>(null);
   const playbackTimer = useRef<NodeJS.Timeout | null>(null);
+  // 打字机动画队列，保证多条消息按到达顺序依次播放
+  const typingQueueRef = useRef<Promise<void>>(Promise.resolve());
 
   useEffect(() => {
     if (meetingId) {
@@ -194,6 +196,66 @@ export default function MeetingDetailPanel({ meetingId, onClose }: MeetingDetail
     return normalized;
   };
 
+  // 按打字速度逐字显示消息内容
+  const playTypewriter = (id: number | string, content: string, speedMs: number) =>
+    new Promise<void>(resolve => {
+      const startedAt = performance.now();
+      setIsTyping(prev => new Set([...prev, id]));
+      const step = (now: number) => {
+        const shown = Math.min(content.length, Math.floor((now - startedAt) / speedMs) + 1);
+        setTypingMessages(prev => new Map([...prev, [id, content.slice(0, shown)]]));
+        if (shown < content.length) {
+          requestAnimationFrame(step);
+        } else {
+          resolve();
+        }
+      };
+      requestAnimationFrame(step);
+    });
+
+  const completeMessage = (data: any) => {
+    // 完成打字机效果，添加到正式消息列表
+    const finalMessage = {
+      id: data.message_id,
+      agent_id: data.agent_id,
+      agent_name: data.agent_name || `Agent ${data.agent_id}`,
+      message_content: data.final_content,
+      message_type: data.message_type,
+      created_at: data.timestamp,
+      metadata: data.metadata
+    };
+
+    console.log('Message complete, adding final message:', finalMessage);
+    
+    setMessages(prev => {
+      // 避免重复添加
+      if (prev.some(msg => msg.id === finalMessage.id)) {
+        return prev;
+      }
+      return [...prev, finalMessage];
+    });
+    setVisibleMessages(prev => {
+      // 避免重复添加
+      if (prev.some(msg => msg.id === finalMessage.id)) {
+        return prev;
+      }
+      return [...prev, finalMessage];
+    });
+
+    // 清除打字机状态 (流式消息的打字机状态以 stream_id 为键)
+    const typingId = data.stream_id ?? data.message_id;
+    setIsTyping(prev => {
+      const newSet = new Set(prev);
+      newSet.delete(typingId);
+      return newSet;
+    });
+    setTypingMessages(prev => {
+      const newMap = new Map(prev);
+      newMap.delete(typingId);
+      return newMap;
+    });
+  };
+
   const connectToSSE = () => {
     try {
       // 如果已有连接，先关闭
@@ -268,49 +330,19 @@ export default function MeetingDetailPanel({ meetingId, onClose }: MeetingDetail
             // 开始打字机效果
             setIsTyping(prev => new Set([...prev, data.message_id]));
             setTypingMessages(prev => new Map([...prev, [data.message_id, '']]));
-          } else if (data.type === 'message_typing') {
-            // 更新打字机内容
-            setTypingMessages(prev => new Map([...prev, [data.message_id, data.partial_content]]));
-          } else if (data.type === 'message_complete') {
-            // 完成打字机效果，添加到正式消息列表
-            const finalMessage = {
-              id: data.message_id,
-              agent_id: data.agent_id,
-              agent_name: data.agent_name || `Agent ${data.agent_id}`,
-              message_content: data.final_content,
-              message_type: data.message_type,
-              created_at: data.timestamp,
-              metadata: data.metadata
-            };
-
-            console.log('Message complete, adding final message:', finalMessage);
-            
-            setMessages(prev => {
-              // 避免重复添加
-              if (prev.some(msg => msg.id === finalMessage.id)) {
-                return prev;
-              }
-              return [...prev, finalMessage];
-            });
-            setVisibleMessages(prev => {
-              // 避免重复添加
-              if (prev.some(msg => msg.id === finalMessage.id)) {
-                return prev;
-              }
-              return [...prev, finalMessage];
-            });
-
-            // 清除打字机状态
-            setIsTyping(prev => {
-              const newSet = new Set(prev);
-              newSet.delete(data.message_id);
-              return newSet;
-            });
+          } else if (data.type === 'message_delta') {
+            // 追加打字机增量内容，按 offset 截断以防重复追加
             setTypingMessages(prev => {
-              const newMap = new Map(prev);
-              newMap.delete(data.message_id);
-              return newMap;
+              const current = (prev.get(data.message_id) || '').slice(0, data.offset);
+              return new Map([...prev, [data.message_id, current + data.delta]]);
             });
+          } else if (data.type === 'message_complete') {
+            // 打字机动画在前端按到达顺序逐条播放，播放完毕后加入正式消息列表
+            typingQueueRef.current = typingQueueRef.current
+              .then(() => data.typing_speed_ms
+                ? playTypewriter(data.message_id, data.final_content || '', data.typing_speed_ms)
+                : undefined)
+              .then(() => completeMessage(data));
           }
         } catch (error) {
           console.error('Error parsing SSE data:', error);